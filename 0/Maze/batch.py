@@ -0,0 +1,87 @@
+import argparse
+import csv
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from maze import SOLVERS, solve_file
+
+FIELDS = ["maze", "mode", "length", "explored", "cost", "time", "error"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve many maze files across a process pool."
+    )
+    parser.add_argument("source", help="directory of maze files or a glob pattern")
+    parser.add_argument("-m", "--mode", choices=SOLVERS, default="bfs")
+    parser.add_argument("-o", "--output", default="results.csv",
+                        help="CSV file to write results to")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--compact", action="store_true",
+                        help="load mazes into compact NumPy grids")
+    parser.add_argument("--images", metavar="DIRECTORY",
+                        help="also render each solution into this directory")
+    args = parser.parse_args()
+
+    files = find_mazes(args.source)
+    if not files:
+        sys.exit(f"No maze files found in {args.source}")
+
+    results = solve_all(files, args.mode, args.compact, args.images, args.workers)
+    write_results(args.output, results)
+
+    failed = sum(1 for result in results if result["error"] is not None)
+    print(f"Solved {len(results) - failed} of {len(results)} mazes, "
+          f"results written to {args.output}")
+
+
+def find_mazes(source):
+    """
+    Returns a sorted list of maze files, either every .txt file in a
+    directory or every file matching a glob pattern.
+    """
+    if os.path.isdir(source):
+        source = os.path.join(source, "*.txt")
+    return sorted(path for path in glob.glob(source) if os.path.isfile(path))
+
+
+def solve_all(files, mode="bfs", compact=False, images=None, workers=None):
+    """
+    Solves every maze in files across a process pool, returning one
+    result dict per file in the same order.
+    """
+    if images is not None:
+        os.makedirs(images, exist_ok=True)
+        targets = [
+            os.path.join(images, os.path.splitext(os.path.basename(path))[0] + ".png")
+            for path in files
+        ]
+    else:
+        targets = [None] * len(files)
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(files) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            solve_file,
+            files,
+            [mode] * len(files),
+            [compact] * len(files),
+            targets,
+            chunksize=chunksize
+        ))
+
+
+def write_results(filename, results):
+    """Writes solve results to a CSV file."""
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()
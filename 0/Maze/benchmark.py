@@ -0,0 +1,138 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+from generate import KINDS, generate, write_maze
+from maze import SOLVERS, Maze
+
+# Modes that also have a compact, index-based implementation
+COMPACT_SOLVERS = ("bfs", "dfs")
+
+# Modes run unless --modes says otherwise; IDA* re-expands so much of a
+# perfect maze that it cannot finish the default sizes in time
+DEFAULT_SOLVERS = tuple(mode for mode in SOLVERS if mode != "idastar")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark every maze solver mode on generated mazes."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000],
+                        help="maze side lengths, up to 10000 (default: 100 1000)")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--modes", nargs="+", choices=SOLVERS, default=list(DEFAULT_SOLVERS),
+                        help="solver modes to run (default: all but idastar)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=600,
+                        help="seconds allowed per solve (default: 600)")
+    parser.add_argument("--directory", default="bench_mazes",
+                        help="where generated mazes are kept between runs")
+    parser.add_argument("-o", "--output", default="bench.json")
+    args = parser.parse_args()
+
+    os.makedirs(args.directory, exist_ok=True)
+    runs = []
+    for kind in args.kinds:
+        for size in args.sizes:
+            filename = maze_file(args.directory, kind, size, args.seed)
+            for mode in args.modes:
+                for compact in (False, True):
+                    if compact and mode not in COMPACT_SOLVERS:
+                        continue
+                    run = run_case(filename, mode, compact, args.timeout)
+                    run.update(kind=kind, size=size)
+                    runs.append(run)
+                    print(format_run(run))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "runs": runs,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+def maze_file(directory, kind, size, seed):
+    """
+    Returns the path of the generated maze for kind, size and seed,
+    generating it first if it is not already on disk.
+    """
+    filename = os.path.join(directory, f"{kind}-{size}-{seed}.txt")
+    if not os.path.exists(filename):
+        write_maze(generate(kind, size, seed), filename)
+    return filename
+
+
+def run_case(filename, mode, compact, timeout):
+    """
+    Solves one maze in a fresh process, so that peak memory belongs to
+    this solve alone, and returns a dict describing the run.
+    """
+    run = {
+        "maze": filename,
+        "mode": mode,
+        "compact": compact,
+        "length": None,
+        "explored": None,
+        "load_time": None,
+        "solve_time": None,
+        "load_memory_kb": None,
+        "peak_memory_kb": None,
+        "error": None,
+    }
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        pending = pool.apply_async(measure, (filename, mode, compact))
+        try:
+            run.update(pending.get(timeout))
+        except multiprocessing.TimeoutError:
+            run["error"] = "timeout"
+        except Exception as e:
+            run["error"] = str(e)
+    return run
+
+
+def measure(filename, mode, compact):
+    """Loads and solves a maze, returning its timing and memory use."""
+    started = time.perf_counter()
+    m = Maze(filename, compact=compact)
+    loaded = time.perf_counter()
+    load_memory = peak_memory_kb()
+    m.solve(mode)
+    return {
+        "length": len(m.solution[0]),
+        "explored": m.num_explored,
+        "load_time": loaded - started,
+        "solve_time": m.solve_time,
+        "load_memory_kb": load_memory,
+        "peak_memory_kb": peak_memory_kb(),
+    }
+
+
+def peak_memory_kb():
+    """Returns this process's peak resident set size in kilobytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def format_run(run):
+    """Returns a one-line summary of a benchmark run."""
+    name = run["mode"] + (" (compact)" if run["compact"] else "")
+    label = f"{run['kind']:<12}{run['size']:>6}  {name:<16}"
+    if run["error"] is not None:
+        return f"{label}error: {run['error']}"
+    return (f"{label}explored {run['explored']:>10}  "
+            f"time {run['solve_time']:8.3f}s  "
+            f"peak {run['peak_memory_kb'] / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import random
+import sys
+
+WALL = ord("#")
+OPEN = ord(" ")
+
+# Maze layouts understood by generate
+KINDS = ("backtracker", "rooms", "sparse", "terrain")
+
+
+def main():
+    if len(sys.argv) not in [4, 5] or sys.argv[1] not in KINDS:
+        sys.exit(f"Usage: python generate.py [{'|'.join(KINDS)}] size output.txt [seed]")
+    seed = int(sys.argv[4]) if len(sys.argv) == 5 else 0
+    write_maze(generate(sys.argv[1], int(sys.argv[2]), seed), sys.argv[3])
+
+
+def generate(kind, size, seed=0):
+    """
+    Returns a size x size maze of the given kind as a list of bytearray
+    rows, with the start A in the top-left and the goal B in the
+    bottom-right. The same kind, size and seed always give the same maze.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"unknown maze kind: {kind}")
+    if size < 5:
+        raise ValueError("maze size must be at least 5")
+    rng = random.Random(seed)
+    if kind == "backtracker":
+        rows, start, goal = backtracker(size, rng)
+    elif kind == "rooms":
+        rows, start, goal = rooms(size, rng)
+    elif kind == "sparse":
+        rows, start, goal = sparse(size, rng)
+    else:
+        rows, start, goal = terrain(size, rng)
+    rows[start[0]][start[1]] = ord("A")
+    rows[goal[0]][goal[1]] = ord("B")
+    return rows
+
+
+def backtracker(size, rng):
+    """
+    Carves a perfect maze with an iterative recursive-backtracker walk.
+    Passages run along odd rows and columns, so exactly one path joins
+    any two cells.
+    """
+    rows = [bytearray([WALL]) * size for _ in range(size)]
+    last = size - 2 if size % 2 else size - 3
+    rows[1][1] = OPEN
+    stack = [(1, 1)]
+    while stack:
+        row, col = stack[-1]
+        choices = [
+            (row + drow, col + dcol)
+            for drow, dcol in ((-2, 0), (2, 0), (0, -2), (0, 2))
+            if 1 <= row + drow <= last and 1 <= col + dcol <= last
+            and rows[row + drow][col + dcol] == WALL
+        ]
+        if not choices:
+            stack.pop()
+            continue
+        r, c = rng.choice(choices)
+        rows[(row + r) // 2][(col + c) // 2] = OPEN
+        rows[r][c] = OPEN
+        stack.append((r, c))
+    return rows, (1, 1), (last, last)
+
+
+def rooms(size, rng):
+    """
+    Splits an open floor into a grid of rooms, with one doorway in each
+    wall between neighboring rooms so every room is reachable.
+    """
+    rows = [bytearray([OPEN]) * size for _ in range(size)]
+    room = max(3, size // 10)
+    lines = list(range(room, size - 1, room))
+    for line in lines:
+        for i in range(size):
+            rows[line][i] = WALL
+            rows[i][line] = WALL
+
+    # Cut a door through each wall segment between two crossings
+    edges = [-1] + lines + [size]
+    for line in lines:
+        for low, high in zip(edges, edges[1:]):
+            if high - low > 1:
+                door = rng.randrange(low + 1, high)
+                rows[line][door] = OPEN
+                rows[door][line] = OPEN
+    return rows, (0, 0), (size - 1, size - 1)
+
+
+def sparse(size, rng, density=0.25):
+    """
+    Scatters walls over an open floor, keeping a random monotone path
+    from corner to corner clear so the maze is always solvable.
+    """
+    rows = [
+        bytearray(WALL if rng.random() < density else OPEN for _ in range(size))
+        for _ in range(size)
+    ]
+    row = col = 0
+    rows[0][0] = OPEN
+    while (row, col) != (size - 1, size - 1):
+        if col == size - 1 or (row < size - 1 and rng.random() < 0.5):
+            row += 1
+        else:
+            col += 1
+        rows[row][col] = OPEN
+    return rows, (0, 0), (size - 1, size - 1)
+
+
+def terrain(size, rng):
+    """
+    Scatters a few walls as in sparse, then gives every open cell a
+    random terrain cost digit from 1 to 9.
+    """
+    rows, start, goal = sparse(size, rng, density=0.1)
+    for row in rows:
+        for j in range(size):
+            if row[j] == OPEN:
+                row[j] = rng.randint(ord("1"), ord("9"))
+    return rows, start, goal
+
+
+def write_maze(rows, filename):
+    """Writes maze rows to a text file."""
+    with open(filename, "wb") as f:
+        for row in rows:
+            f.write(row)
+            f.write(b"\n")
+
+
+if __name__ == "__main__":
+    main()
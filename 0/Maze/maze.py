@@ -1,21 +1,66 @@
+import hashlib
+import heapq
+import itertools
+import math
+import mmap
+import os
+import struct
 import sys
+import time
+from array import array
+from collections import deque
+
+# Search strategies understood by Maze.solve
+SOLVERS = (
+    "bfs", "dfs", "astar", "greedy", "bidirectional", "idastar",
+    "dijkstra", "astar-cost"
+)
+
+# Terrain digits that mark open cells costing that much to enter
+TERRAIN = "123456789"
+
+# States the "idastar" mode may remember per iteration to cut repeat paths
+IDASTAR_TABLE_SIZE = 1 << 16
+
+# Moves as (action, row offset, column offset), opposites paired up
+MOVES = (("up", -1, 0), ("down", 1, 0), ("left", 0, -1), ("right", 0, 1))
+
+# Action that undoes each move, used to reverse paths found from the goal
+OPPOSITE = {"up": "down", "down": "up", "left": "right", "right": "left"}
+
 
 class Node():
-    def __init__(self, state, parent, action):
+    __slots__ = ("state", "parent", "action", "cost")
+
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.cost = cost
 
 
 class StackFrontier():
+    """
+    Last-in first-out frontier.
+
+    Nodes are kept in a deque so adding and removing are O(1), and the
+    states currently in the frontier are counted in a dict so that
+    contains_state is an O(1) lookup rather than a scan.
+    """
+
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        self.states = {}
+
+    def __len__(self):
+        return len(self.frontier)
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -24,24 +69,251 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.pop()
+            count = self.states[node.state] - 1
+            if count:
+                self.states[node.state] = count
+            else:
+                del self.states[node.state]
             return node
 
+    def pop(self):
+        return self.frontier.pop()
+
 
 class QueueFrontier(StackFrontier):
+    """
+    First-in first-out frontier.
+    """
+
+    def pop(self):
+        return self.frontier.popleft()
+
+
+class PriorityFrontier(StackFrontier):
+    """
+    Frontier that always removes the node with the lowest priority.
+
+    Nodes live in a binary heap keyed on priority(node); ties are broken
+    in insertion order.
+    """
+
+    def __init__(self, priority):
+        super().__init__()
+        self.frontier = []
+        self.priority = priority
+        self.counter = itertools.count()
+
+    def add(self, node):
+        heapq.heappush(
+            self.frontier, (self.priority(node), next(self.counter), node)
+        )
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def pop(self):
+        return heapq.heappop(self.frontier)[2]
+
+
+class CellSet():
+    """
+    Set of (row, col) cells backed by one byte per cell of a grid.
+    """
+
+    __slots__ = ("width", "flags")
+
+    def __init__(self, height, width):
+        self.width = width
+        self.flags = bytearray(height * width)
+
+    def __contains__(self, cell):
+        return self.flags[cell[0] * self.width + cell[1]] != 0
+
+    def __len__(self):
+        return self.flags.count(1)
+
+    def __iter__(self):
+        index = self.flags.find(1)
+        while index != -1:
+            yield divmod(index, self.width)
+            index = self.flags.find(1, index + 1)
+
+    def add(self, cell):
+        self.flags[cell[0] * self.width + cell[1]] = 1
+
+
+class DistanceField():
+    """
+    Shortest distance to a maze's goal from every cell, along with the
+    first move of a shortest path from that cell. Distances count terrain
+    costs when the maze has them, and moves otherwise.
+    """
+
+    # File header: magic, height, width, goal row, goal column
+    HEADER = struct.Struct("<4sqqqq")
+    MAGIC = b"MZF2"
+
+    def __init__(self, height, width, goal, distance, step):
+        self.height = height
+        self.width = width
+        self.goal = goal
+
+        # Cost of reaching the goal per flat cell index, -1 if unreachable
+        self.distance = distance
+
+        # 1 + index into MOVES of the next move toward the goal, 0 if none
+        self.step = step
+
+    @classmethod
+    def build(cls, height, width, walls, goal, costs=None):
+        """
+        Runs one breadth-first search backwards from goal over walls, a
+        flat sequence with a truthy entry for every wall cell, or one run
+        of Dijkstra's algorithm if costs gives the cost of entering each
+        cell.
+        """
+        if costs is not None:
+            return cls.build_weighted(height, width, walls, goal, costs)
+        size = height * width
+        distance = array("i", [-1]) * size
+        step = bytearray(size)
+
+        # Each cell is queued at most once, so the queue never outgrows size
+        pending = array("i" if size < 2 ** 31 else "q", [0]) * size
+        target = goal[0] * width + goal[1]
+        distance[target] = 0
+        pending[0] = target
+        head, tail = 0, 1
+
+        while head < tail:
+            index = pending[head]
+            head += 1
+            reach = distance[index] + 1
+            row, col = divmod(index, width)
+
+            # A neighbor steps back into this cell with the opposite move,
+            # and MOVES lists opposites in adjacent pairs
+            for move, (action, drow, dcol) in enumerate(MOVES):
+                r, c = row + drow, col + dcol
+                if 0 <= r < height and 0 <= c < width:
+                    neighbor = index + drow * width + dcol
+                    if not walls[neighbor] and distance[neighbor] == -1:
+                        distance[neighbor] = reach
+                        step[neighbor] = (move ^ 1) + 1
+                        pending[tail] = neighbor
+                        tail += 1
+
+        return cls(height, width, goal, distance, step)
+
+    @classmethod
+    def build_weighted(cls, height, width, walls, goal, costs):
+        """
+        Runs Dijkstra's algorithm backwards from goal, where stepping into
+        a cell costs its entry in costs, with heap entries packing cost
+        and cell index into one int as Maze.solve_dijkstra does.
+        """
+        size = height * width
+        distance = array("i", [-1]) * size
+        step = bytearray(size)
+        settled = bytearray(size)
+        target = goal[0] * width + goal[1]
+        distance[target] = 0
+        heap = [target]
+
+        while heap:
+            index = heapq.heappop(heap) % size
+            if settled[index]:
+                continue
+            settled[index] = 1
+
+            # Moving from a neighbor into this cell costs this cell's terrain
+            reach = distance[index] + costs[index]
+            row, col = divmod(index, width)
+            for move, (action, drow, dcol) in enumerate(MOVES):
+                r, c = row + drow, col + dcol
+                if 0 <= r < height and 0 <= c < width:
+                    neighbor = index + drow * width + dcol
+                    if walls[neighbor] or settled[neighbor]:
+                        continue
+                    if distance[neighbor] == -1 or reach < distance[neighbor]:
+                        distance[neighbor] = reach
+                        step[neighbor] = (move ^ 1) + 1
+                        heapq.heappush(heap, reach * size + neighbor)
+
+        return cls(height, width, goal, distance, step)
+
+    def distance_from(self, cell):
+        """Returns the path cost from cell to the goal, or None."""
+        distance = self.distance[cell[0] * self.width + cell[1]]
+        return distance if distance != -1 else None
+
+    def path(self, start):
+        """
+        Returns the (actions, cells) shortest path from start to the goal
+        by following recorded steps.
+        """
+        index = start[0] * self.width + start[1]
+        if self.distance[index] == -1:
+            raise Exception("no solution")
+        target = self.goal[0] * self.width + self.goal[1]
+        actions = []
+        cells = []
+        while index != target:
+            action, drow, dcol = MOVES[self.step[index] - 1]
+            index += drow * self.width + dcol
+            actions.append(action)
+            cells.append(divmod(index, self.width))
+        return (actions, cells)
+
+    def save(self, filename):
+        """
+        Writes the field to a binary file, through a temporary file so an
+        interrupted write never leaves a partial field behind.
+        """
+        partial = f"{filename}.{os.getpid()}.tmp"
+        try:
+            with open(partial, "wb") as f:
+                f.write(self.HEADER.pack(
+                    self.MAGIC, self.height, self.width, *self.goal
+                ))
+                f.write(self.distance.tobytes())
+                f.write(self.step)
+            os.replace(partial, filename)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    @classmethod
+    def load(cls, filename):
+        """Reads a field written by save."""
+        with open(filename, "rb") as f:
+            header = f.read(cls.HEADER.size)
+            if len(header) != cls.HEADER.size:
+                raise ValueError(f"{filename} is truncated")
+            magic, height, width, row, col = cls.HEADER.unpack(header)
+            if magic != cls.MAGIC:
+                raise ValueError(f"{filename} is not a distance field")
+            distance = array("i")
+            try:
+                distance.fromfile(f, height * width)
+            except EOFError:
+                raise ValueError(f"{filename} is truncated")
+            step = bytearray(f.read(height * width))
+            if len(step) != height * width:
+                raise ValueError(f"{filename} is truncated")
+        return cls(height, width, (row, col), distance, step)
 
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
 
 class Maze():
 
-    def __init__(self, filename):
+    def __init__(self, filename, compact=False):
+
+        # Compact mazes are streamed from disk into a NumPy bool array
+        self.filename = filename
+        self.compact = compact
+        self.field = None
+        if compact:
+            self.load_compact(filename)
+            return
 
         # Read file and set height and width of maze
         with open(filename) as f:
@@ -58,8 +330,11 @@ class Maze():
         self.height = len(contents)
         self.width = max(len(line) for line in contents)
 
-        # Keep track of walls
+        # Keep track of walls, and of entry costs if any terrain is given
         self.walls = []
+        self.costs = None
+        if any(digit in line for line in contents for digit in TERRAIN):
+            self.costs = bytearray([1]) * (self.height * self.width)
         for i in range(self.height):
             row = []
             for j in range(self.width):
@@ -72,6 +347,9 @@ class Maze():
                         row.append(False)
                     elif contents[i][j] == " ":
                         row.append(False)
+                    elif contents[i][j] in TERRAIN:
+                        self.costs[i * self.width + j] = int(contents[i][j])
+                        row.append(False)
                     else:
                         row.append(True)
                 except IndexError:
@@ -81,22 +359,124 @@ class Maze():
         self.solution = None
 
 
+    def load_compact(self, filename):
+        """
+        Parses the maze file through a memory map straight into a NumPy
+        wall grid, validating the start and goal as each row is read.
+
+        Each byte is one cell, so the file is expected to be ASCII.
+        """
+        import numpy as np
+
+        with open(filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise Exception("maze must have exactly one start point")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+
+                # Index line ends so the grid can be allocated up front
+                size = len(contents)
+                ends = array("q")
+                position = 0
+                while position < size:
+                    end = contents.find(b"\n", position)
+                    if end == -1:
+                        end = size
+                    ends.append(end)
+                    position = end + 1
+
+                # Parse each line as a zero-copy view of the mapping
+                data = row = None
+                try:
+                    data = np.frombuffer(contents, dtype=np.uint8)
+                    rows = []
+                    width = 0
+                    begin = 0
+                    for end in ends:
+                        row = data[begin:end]
+                        if len(row) and row[-1] == ord("\r"):
+                            row = row[:-1]
+                        rows.append((begin, len(row)))
+                        width = max(width, len(row))
+                        begin = end + 1
+
+                    self.height = len(rows)
+                    self.width = width
+                    self.walls = np.zeros((self.height, self.width), dtype=bool)
+                    self.costs = None
+                    self.start = None
+                    self.goal = None
+                    for i, (begin, length) in enumerate(rows):
+                        row = data[begin:begin + length]
+
+                        # Cells past the end of a short line stay open
+                        terrain = (row >= ord("1")) & (row <= ord("9"))
+                        self.walls[i, :length] = (
+                            (row != ord(" ")) & (row != ord("A")) & (row != ord("B"))
+                            & ~terrain
+                        )
+                        if terrain.any():
+                            if self.costs is None:
+                                self.costs = bytearray([1]) * (self.height * self.width)
+                            offset = i * self.width
+                            costs = np.frombuffer(self.costs, dtype=np.uint8)
+                            costs[offset:offset + length][terrain] = row[terrain] - ord("0")
+                        for marker, attribute, message in (
+                            ("A", "start", "maze must have exactly one start point"),
+                            ("B", "goal", "maze must have exactly one goal"),
+                        ):
+                            found = np.flatnonzero(row == ord(marker))
+                            if len(found) > 1 or (len(found) and getattr(self, attribute)):
+                                raise Exception(message)
+                            if len(found):
+                                setattr(self, attribute, (i, int(found[0])))
+                finally:
+
+                    # Release the views before the mapping is closed
+                    data = row = None
+
+        if self.start is None:
+            raise Exception("maze must have exactly one start point")
+        if self.goal is None:
+            raise Exception("maze must have exactly one goal")
+        self.solution = None
+
+
+    def cell_kinds(self, show_solution=True, show_explored=False):
+        """
+        Returns a NumPy array giving each cell's kind for rendering:
+        0 empty, 1 explored, 2 solution, 3 goal, 4 start, 5 wall.
+        """
+        import numpy as np
+
+        kinds = np.zeros((self.height, self.width), dtype=np.uint8)
+        if self.solution is not None:
+            if show_explored:
+                if isinstance(self.explored, CellSet):
+                    explored = np.frombuffer(self.explored.flags, dtype=np.uint8)
+                    kinds[explored.reshape(self.height, self.width) != 0] = 1
+                elif self.explored:
+                    rows, cols = np.array(list(self.explored)).T
+                    kinds[rows, cols] = 1
+            if show_solution and self.solution[1]:
+                rows, cols = np.array(self.solution[1]).T
+                kinds[rows, cols] = 2
+
+        # Later kinds take precedence over earlier ones
+        kinds[self.goal] = 3
+        kinds[self.start] = 4
+        kinds[np.asarray(self.walls, dtype=bool)] = 5
+        return kinds
+
+
     def print(self):
-        solution = self.solution[1] if self.solution is not None else None
+        import numpy as np
+
+        # Each kind maps to a character code, and each row decodes at once
+        characters = np.array([ord(c) for c in "  *BA█"], dtype="<u4")
+        codes = characters[self.cell_kinds()]
         print()
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-                if col:
-                    print("█", end="")
-                elif (i, j) == self.start:
-                    print("A", end="")
-                elif (i, j) == self.goal:
-                    print("B", end="")
-                elif solution is not None and (i, j) in solution:
-                    print("*", end="")
-                else:
-                    print(" ", end="")
-            print()
+        for row in codes:
+            print(row.tobytes().decode("utf-32-le"))
         print()
 
 
@@ -116,20 +496,58 @@ class Maze():
         return result
 
 
-    def solve(self):
-        """Finds a solution to maze, if one exists."""
+    def heuristic(self, state):
+        """Manhattan distance from state to the goal."""
+        return abs(state[0] - self.goal[0]) + abs(state[1] - self.goal[1])
+
+
+    def solve(self, mode="bfs"):
+        """
+        Finds a solution to maze, if one exists.
+
+        mode selects the search strategy: "bfs", "dfs", "astar" (A* with a
+        Manhattan heuristic), "greedy" (greedy best-first search),
+        "bidirectional" (breadth-first from both ends) or "idastar"
+        (iterative-deepening A*). These count every move as one step.
+        "dijkstra" and "astar-cost" instead find the cheapest path over
+        terrain costs.
+        """
+        if mode not in SOLVERS:
+            raise ValueError(f"unknown solver mode: {mode}")
+        if mode == "bidirectional":
+            return self.solve_bidirectional()
+        if mode == "idastar":
+            return self.solve_idastar(IDASTAR_TABLE_SIZE)
+        if mode in ("dijkstra", "astar-cost"):
+            return self.solve_dijkstra(heuristic=mode == "astar-cost")
+        if self.compact and mode in ("bfs", "dfs"):
+            return self.solve_compact(mode)
+        started = time.perf_counter()
 
         # Keep track of number of states explored
         self.num_explored = 0
 
         # Initialize frontier to just the starting position
         start = Node(state=self.start, parent=None, action=None)
-        frontier = QueueFrontier()
+        if mode == "bfs":
+            frontier = QueueFrontier()
+        elif mode == "dfs":
+            frontier = StackFrontier()
+        elif mode == "astar":
+            # Among equal f, prefer the deeper node to avoid expanding plateaus
+            frontier = PriorityFrontier(
+                lambda node: (node.cost + self.heuristic(node.state), -node.cost)
+            )
+        else:
+            frontier = PriorityFrontier(lambda node: self.heuristic(node.state))
         frontier.add(start)
 
         # Initialize an empty explored set
         self.explored = set()
 
+        # Cheapest known path cost to each state, used by A*
+        cost = {self.start: 0}
+
         # Keep looping until solution found
         while True:
 
@@ -139,19 +557,24 @@ class Maze():
 
             # Choose a node from the frontier
             node = frontier.remove()
+
+            # A* may still hold entries for states since reached more cheaply
+            if node.state in self.explored:
+                continue
             self.num_explored += 1
+
             # If node is the goal, then we have a solution
             if node.state == self.goal:
                 actions = []
                 cells = []
                 while node.parent is not None:
                     actions.append(node.action)
-                    print(node.action)
                     cells.append(node.state)
                     node = node.parent
                 actions.reverse()
                 cells.reverse()
                 self.solution = (actions, cells)
+                self.solve_time = time.perf_counter() - started
                 return
 
             # Mark node as explored
@@ -159,70 +582,466 @@ class Maze():
 
             # Add neighbors to frontier
             for action, state in self.neighbors(node.state):
-                if not frontier.contains_state(state) and state not in self.explored:
-                    child = Node(state=state, parent=node, action=action)
-                    frontier.add(child)
+                if state in self.explored:
+                    continue
+                if mode == "astar":
+                    if node.cost + 1 >= cost.get(state, math.inf):
+                        continue
+                    cost[state] = node.cost + 1
+                elif frontier.contains_state(state):
+                    continue
+                child = Node(
+                    state=state, parent=node, action=action, cost=node.cost + 1
+                )
+                frontier.add(child)
 
-    def output_image(self, filename, show_solution=True, show_explored=False):
-        from PIL import Image, ImageDraw
-        cell_size = 50
-        cell_border = 2
+    def solve_compact(self, mode):
+        """
+        Breadth- or depth-first search over flat cell indices.
 
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.width * cell_size, self.height * cell_size),
-            "black"
-        )
-        draw = ImageDraw.Draw(img)
+        The move that first reached each cell is kept in a byte array and
+        pending cells in a preallocated int array, so no Node objects or
+        explored set are allocated.
+        """
+        started = time.perf_counter()
+        height, width = self.height, self.width
+        size = height * width
+        walls = memoryview(self.walls.reshape(-1))
+        self.num_explored = 0
+        self.explored = CellSet(height, width)
+        explored = self.explored.flags
 
-        solution = self.solution[1] if self.solution is not None else None
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
+        # 0 for unreached cells, otherwise 1 + index into MOVES
+        reached = bytearray(size)
 
-                # Walls
-                if col:
-                    fill = (40, 40, 40)
+        # Each cell is queued at most once, so the queue never outgrows size
+        pending = array("i" if size < 2 ** 31 else "q", [0]) * size
+        start = self.start[0] * width + self.start[1]
+        goal = self.goal[0] * width + self.goal[1]
+        reached[start] = len(MOVES) + 1
+        pending[0] = start
+        head, tail = 0, 1
 
-                # Start
-                elif (i, j) == self.start:
-                    fill = (255, 0, 0)
+        while True:
 
-                # Goal
-                elif (i, j) == self.goal:
-                    fill = (0, 171, 28)
+            # If nothing left to visit, then no path
+            if head == tail:
+                raise Exception("no solution")
 
-                # Solution
-                elif solution is not None and show_solution and (i, j) in solution:
-                    fill = (220, 235, 113)
+            # Take the oldest cell for BFS and the newest for DFS
+            if mode == "bfs":
+                index = pending[head]
+                head += 1
+            else:
+                tail -= 1
+                index = pending[tail]
+            self.num_explored += 1
+            if index == goal:
+                break
+            explored[index] = 1
 
-                # Explored
-                elif solution is not None and show_explored and (i, j) in self.explored:
-                    fill = (212, 97, 85)
+            # Queue each open, unreached neighbor
+            row, col = divmod(index, width)
+            if row > 0:
+                neighbor = index - width
+                if not walls[neighbor] and not reached[neighbor]:
+                    reached[neighbor] = 1
+                    pending[tail] = neighbor
+                    tail += 1
+            if row < height - 1:
+                neighbor = index + width
+                if not walls[neighbor] and not reached[neighbor]:
+                    reached[neighbor] = 2
+                    pending[tail] = neighbor
+                    tail += 1
+            if col > 0:
+                neighbor = index - 1
+                if not walls[neighbor] and not reached[neighbor]:
+                    reached[neighbor] = 3
+                    pending[tail] = neighbor
+                    tail += 1
+            if col < width - 1:
+                neighbor = index + 1
+                if not walls[neighbor] and not reached[neighbor]:
+                    reached[neighbor] = 4
+                    pending[tail] = neighbor
+                    tail += 1
 
-                # Empty cell
-                else:
-                    fill = (237, 240, 252)
+        self.solution = self.trace(reached, index)
+        self.solve_time = time.perf_counter() - started
 
-                # Draw cell
-                draw.rectangle(
-                    ([(j * cell_size + cell_border, i * cell_size + cell_border),
-                      ((j + 1) * cell_size - cell_border, (i + 1) * cell_size - cell_border)]),
-                    fill=fill
-                )
 
+    def trace(self, reached, index):
+        """
+        Returns the (actions, cells) path from the start to the cell at
+        index by following moves recorded as 1 + index into MOVES.
+        """
+        start = self.start[0] * self.width + self.start[1]
+        actions = []
+        cells = []
+        while index != start:
+            action, drow, dcol = MOVES[reached[index] - 1]
+            actions.append(action)
+            cells.append(divmod(index, self.width))
+            index -= drow * self.width + dcol
+        actions.reverse()
+        cells.reverse()
+        return (actions, cells)
+
+
+    def solve_dijkstra(self, heuristic=False):
+        """
+        Finds a minimum-cost solution, where entering a cell costs its
+        terrain digit, with Dijkstra's algorithm or, if heuristic is True,
+        A* on the Manhattan distance scaled by the cheapest terrain.
+
+        Heap entries pack priority and cell index into one int, and
+        distances and moves live in flat arrays, so the search loop
+        allocates no per-node objects.
+        """
+        started = time.perf_counter()
+        height, width = self.height, self.width
+        size = height * width
+        walls = self.flat_walls()
+        costs = self.costs if self.costs is not None else bytes([1]) * size
+        self.num_explored = 0
+        self.explored = CellSet(height, width)
+        explored = self.explored.flags
+
+        # Cheapest cost to enter any open cell keeps the heuristic admissible
+        scale = 0
+        if heuristic:
+            scale = min(
+                (cost for cost, wall in zip(costs, walls) if not wall), default=1
+            )
+        goal_row, goal_col = self.goal
+
+        # -1 for unreached cells, otherwise cheapest known path cost
+        distance = array("q", [-1]) * size
+
+        # 0 for unreached cells, otherwise 1 + index into MOVES
+        reached = bytearray(size)
+
+        start = self.start[0] * width + self.start[1]
+        goal = goal_row * width + goal_col
+        distance[start] = 0
+        heap = [self.heuristic(self.start) * scale * size + start]
+
+        while True:
+
+            # If nothing left in the heap, then no path
+            if not heap:
+                raise Exception("no solution")
+
+            # Skip entries for cells already settled more cheaply
+            index = heapq.heappop(heap) % size
+            if explored[index]:
+                continue
+            explored[index] = 1
+            self.num_explored += 1
+            if index == goal:
+                break
+
+            row, col = divmod(index, width)
+            base = distance[index]
+            for move, (action, drow, dcol) in enumerate(MOVES):
+                r, c = row + drow, col + dcol
+                if 0 <= r < height and 0 <= c < width:
+                    neighbor = index + drow * width + dcol
+                    if walls[neighbor] or explored[neighbor]:
+                        continue
+                    cost = base + costs[neighbor]
+                    if distance[neighbor] == -1 or cost < distance[neighbor]:
+                        distance[neighbor] = cost
+                        reached[neighbor] = move + 1
+                        priority = cost + scale * (abs(r - goal_row) + abs(c - goal_col))
+                        heapq.heappush(heap, priority * size + neighbor)
+
+        self.solution = self.trace(reached, index)
+        self.solve_time = time.perf_counter() - started
+
+
+    def path_cost(self):
+        """Returns the total terrain cost of the current solution."""
+        if self.costs is None:
+            return len(self.solution[1])
+        return sum(self.costs[i * self.width + j] for i, j in self.solution[1])
+
+
+    def solve_bidirectional(self):
+        """
+        Finds a shortest solution by growing breadth-first searches from
+        both the start and the goal until they meet.
+        """
+        started = time.perf_counter()
+        self.num_explored = 0
+        self.explored = set()
+
+        # For each side, map state to (previous state, action, distance)
+        parents = [{self.start: (None, None, 0)}, {self.goal: (None, None, 0)}]
+        frontiers = [[self.start], [self.goal]]
+        meeting = None
+
+        while meeting is None:
+
+            # If either side runs out of states, then no path
+            if not frontiers[0] or not frontiers[1]:
+                raise Exception("no solution")
+
+            # Expand one full layer of the smaller frontier
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, other = parents[side], parents[1 - side]
+            best = math.inf
+            layer = []
+            for state in frontiers[side]:
+                self.num_explored += 1
+                self.explored.add(state)
+                distance = seen[state][2] + 1
+                for action, neighbor in self.neighbors(state):
+                    if neighbor in seen:
+                        continue
+                    seen[neighbor] = (state, action, distance)
+                    layer.append(neighbor)
+
+                    # Keep the cheapest meeting point found in this layer
+                    if neighbor in other and distance + other[neighbor][2] < best:
+                        best = distance + other[neighbor][2]
+                        meeting = neighbor
+            frontiers[side] = layer
+
+        # Walk back from the meeting point to the start
+        actions = []
+        cells = []
+        state = meeting
+        while parents[0][state][0] is not None:
+            previous, action, _ = parents[0][state]
+            actions.append(action)
+            cells.append(state)
+            state = previous
+        actions.reverse()
+        cells.reverse()
+
+        # Then forward from the meeting point to the goal, reversing moves
+        state = meeting
+        while parents[1][state][0] is not None:
+            previous, action, _ = parents[1][state]
+            actions.append(OPPOSITE[action])
+            cells.append(previous)
+            state = previous
+
+        self.solution = (actions, cells)
+        self.solve_time = time.perf_counter() - started
+
+
+    def solve_idastar(self, table_size=0):
+        """
+        Finds a shortest solution with iterative-deepening A*, keeping only
+        the current path in memory. num_explored counts every expansion
+        across all iterations, and explored stays empty.
+
+        If table_size is positive, up to that many states also remember
+        the cheapest cost they were reached at during the current
+        iteration, so costlier repeat visits are cut off. Without the
+        table, mazes with many alternative routes take exponential time.
+        """
+        started = time.perf_counter()
+        self.num_explored = 0
+        self.explored = set()
+
+        def children(state):
+            """Neighbors of state, most promising first."""
+            return iter(sorted(
+                self.neighbors(state), key=lambda child: self.heuristic(child[1])
+            ))
+
+        bound = self.heuristic(self.start)
+        while True:
+
+            # Depth-first search for the goal within the current f bound
+            next_bound = math.inf
+            table = {}
+            on_path = {self.start}
+            stack = [(self.start, 0, children(self.start))]
+            actions = []
+            self.num_explored += 1
+            while stack:
+                state, cost, remaining = stack[-1]
+                child = next(remaining, None)
+
+                # Backtrack once every child has been tried
+                if child is None:
+                    stack.pop()
+                    on_path.discard(state)
+                    if actions:
+                        actions.pop()
+                    continue
+
+                action, neighbor = child
+                if neighbor in on_path:
+                    continue
+                f = cost + 1 + self.heuristic(neighbor)
+                if f > bound:
+                    next_bound = min(next_bound, f)
+                    continue
+                if table_size:
+                    if table.get(neighbor, math.inf) <= cost + 1:
+                        continue
+                    if neighbor in table or len(table) < table_size:
+                        table[neighbor] = cost + 1
+
+                actions.append(action)
+                if neighbor == self.goal:
+                    cells = [entry[0] for entry in stack[1:]]
+                    cells.append(neighbor)
+                    self.solution = (actions, cells)
+                    self.solve_time = time.perf_counter() - started
+                    return
+                self.num_explored += 1
+                on_path.add(neighbor)
+                stack.append((neighbor, cost + 1, children(neighbor)))
+
+            # If no path was cut off by the bound, then no path
+            if next_bound == math.inf:
+                raise Exception("no solution")
+            bound = next_bound
+
+
+    def flat_walls(self):
+        """Returns walls as a flat bytes object, one byte per cell."""
+        if self.compact:
+            return self.walls.tobytes()
+        return bytes(cell for row in self.walls for cell in row)
+
+
+    def file_hash(self):
+        """Returns the SHA-256 hex digest of the maze file."""
+        digest = hashlib.sha256()
+        with open(self.filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+    def distance_field(self, cache=None):
+        """
+        Returns the DistanceField for this maze's goal, building it on
+        first use. If cache names a directory, fields are stored there
+        keyed by the hash of the maze file and reused across runs.
+        """
+        if self.field is not None:
+            return self.field
+        path = None
+        if cache is not None:
+            path = os.path.join(cache, self.file_hash() + ".field")
+            if os.path.exists(path):
+                try:
+                    self.field = DistanceField.load(path)
+                    return self.field
+                except ValueError:
+                    # Truncated or in an older format, so build it again
+                    pass
+        self.field = DistanceField.build(
+            self.height, self.width, self.flat_walls(), self.goal, self.costs
+        )
+        if path is not None:
+            os.makedirs(cache, exist_ok=True)
+            self.field.save(path)
+        return self.field
+
+
+    def route(self, start, cache=None):
+        """
+        Returns the (actions, cells) cheapest path from start to the goal
+        using the maze's distance field.
+        """
+        row, col = start
+        if not (0 <= row < self.height and 0 <= col < self.width) or self.walls[row][col]:
+            raise ValueError(f"{start} is not an open cell")
+        return self.distance_field(cache).path(start)
+
+
+    def output_image(self, filename, show_solution=True, show_explored=False):
+        import numpy as np
+        from PIL import Image
+        cell_size = 50
+        cell_border = 2
+
+        # Colors for empty, explored, solution, goal, start and wall cells
+        palette = np.array([
+            (237, 240, 252),
+            (212, 97, 85),
+            (220, 235, 113),
+            (0, 171, 28),
+            (255, 0, 0),
+            (40, 40, 40)
+        ], dtype=np.uint8)
+        colors = palette[self.cell_kinds(show_solution, show_explored)]
+
+        # Pixels of a cell that are filled rather than black border
+        inside = np.zeros(cell_size, dtype=np.uint8)
+        inside[cell_border:cell_size - cell_border + 1] = 1
+
+        # Scale every cell up to a bordered tile in one broadcast
+        pixels = np.empty(
+            (self.height, cell_size, self.width, cell_size, 4), dtype=np.uint8
+        )
+        pixels[..., :3] = (
+            colors[:, None, :, None, :]
+            * inside[None, :, None, None, None]
+            * inside[None, None, None, :, None]
+        )
+        pixels[..., 3] = 255
+        img = Image.fromarray(
+            pixels.reshape(self.height * cell_size, self.width * cell_size, 4),
+            "RGBA"
+        )
         img.save(filename)
 
 
-if len(sys.argv) != 2:
-    sys.exit("Usage: python maze.py maze.txt")
+def solve_file(filename, mode="bfs", compact=False, image=None):
+    """
+    Loads and solves one maze file, optionally saving an image of the
+    solution, and returns a dict summarizing the run.
+    """
+    result = {
+        "maze": filename,
+        "mode": mode,
+        "length": None,
+        "explored": None,
+        "cost": None,
+        "time": None,
+        "error": None,
+    }
+    try:
+        m = Maze(filename, compact=compact)
+        m.solve(mode)
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+    result["length"] = len(m.solution[0])
+    result["explored"] = m.num_explored
+    result["cost"] = m.path_cost()
+    result["time"] = m.solve_time
+    if image is not None:
+        m.output_image(image, show_explored=True)
+    return result
+
+
+def main():
+    if len(sys.argv) not in [2, 3] or (len(sys.argv) == 3 and sys.argv[2] not in SOLVERS):
+        sys.exit(f"Usage: python maze.py maze.txt [{'|'.join(SOLVERS)}]")
+
+    m = Maze(sys.argv[1])
+    print("Maze:")
+    m.print()
+    print("Solving...")
+    m.solve(sys.argv[2] if len(sys.argv) == 3 else "bfs")
+    print("States Explored:", m.num_explored)
+    print(f"Time: {m.solve_time:.3f}s")
+    print("Solution:")
+    m.print()
+    m.output_image("maze.png", show_explored=True)
+
 
-m = Maze(sys.argv[1])
-print("Maze:")
-m.print()
-print("Solving...")
-m.solve()
-print("States Explored:", m.num_explored)
-print("Solution:")
-m.print()
-m.output_image("maze.png", show_explored=True)
+if __name__ == "__main__":
+    main()
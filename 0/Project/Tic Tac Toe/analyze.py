@@ -0,0 +1,32 @@
+import argparse
+import json
+
+import tictactoe as ttt
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score every legal move of recorded Tic Tac Toe positions."
+    )
+    parser.add_argument("positions", help="file of encoded boards, one per line")
+    parser.add_argument("--size", type=int, nargs=3, default=[3, 3, 3],
+                        metavar=("ROWS", "COLS", "K"),
+                        help="board size and win length (default: 3 3 3)")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="plies to search (default: to the end of the game)")
+    args = parser.parse_args()
+    if args.depth is not None and args.depth < 1:
+        parser.error("--depth must be at least 1")
+
+    ttt.configure(*args.size)
+    for line, values in ttt.analyzeFile(args.positions, args.depth):
+        print(json.dumps({
+            "position": line,
+            "values": {f"{i},{j}": value for (i, j), value in values.items()}
+        }))
+    stats = ttt.stats
+    print(f"# {stats['nodes']} nodes in {stats['time']:.3f}s", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import tictactoe as ttt
+
+
+def main():
+    count = ttt.buildTable()
+    print(f"Solved {count} positions into {ttt.TABLE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,23 @@
+import copy
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import tictactoe as ttt
 
+# Optional board shape: python runner.py [rows cols k]
+if len(sys.argv) == 4:
+    ttt.configure(*(int(arg) for arg in sys.argv[1:]))
+elif len(sys.argv) != 1:
+    sys.exit("Usage: python runner.py [rows cols k]")
+
 pygame.init()
 size = width, height = 600, 400
 
+# Frames drawn per second at most
+FPS = 30
+
 # Colors
 black = (0, 0, 0)
 white = (255, 255, 255)
@@ -13,17 +25,37 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+rows, cols = ttt.game.rows, ttt.game.cols
+tile_size = min(80, (height - 140) // rows, (width - 40) // cols)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
+
+# The AI searches on a worker thread so the window keeps handling events
+clock = pygame.time.Clock()
+worker = ThreadPoolExecutor(max_workers=1)
+search = None
+cancel = None
+stale = None
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if cancel is not None:
+                cancel.set()
+            worker.shutdown()
             sys.exit()
 
+        # Escape leaves the game, even while the computer is thinking
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            user = None
+            board = ttt.initial_state()
+
+    # A cancelled search must finish before the next one shares its tables
+    if stale is not None and stale.done():
+        stale = None
+
     screen.fill(black)
 
     # Let user choose a player.
@@ -64,13 +96,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (cols / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(cols):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -105,22 +136,21 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Start the AI search, and play its move once it is done
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if search is None and stale is None:
+                cancel = threading.Event()
+                search = worker.submit(ttt.minimax, copy.deepcopy(board), stop=cancel)
+            elif search is not None and search.done():
+                board = ttt.result(board, search.result())
+                search = cancel = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(cols):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -138,6 +168,12 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+
+    # Cancel a search whose game has been left behind
+    if search is not None and (user is None or ttt.terminal(board)):
+        cancel.set()
+        stale = search
+        search = cancel = None
 
     pygame.display.flip()
+    clock.tick(FPS)
@@ -0,0 +1,28 @@
+import threading
+import time
+
+import tictactoe as ttt
+
+
+def test_large_board_search_keeps_to_budget():
+    ttt.configure(15, 15, 5)
+    try:
+        board = ttt.initial_state()
+        board = ttt.result(board, (7, 7))
+        started = time.perf_counter()
+        ttt.minimax(board, budget=0.1)
+        assert time.perf_counter() - started < 0.15
+    finally:
+        ttt.configure()
+
+
+def test_stop_event_ends_large_board_search():
+    ttt.configure(15, 15, 5)
+    try:
+        stop = threading.Event()
+        threading.Timer(0.1, stop.set).start()
+        started = time.perf_counter()
+        ttt.minimax(ttt.initial_state(), budget=None, stop=stop)
+        assert time.perf_counter() - started < 0.15
+    finally:
+        ttt.configure()
@@ -2,42 +2,451 @@
 Tic Tac Toe Player
 """
 import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
 X = "X"
 O = "O"
 EMPTY = None
 
+# Bound types for values stored in the transposition table
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Score for a won game, plus one for every cell still empty
+WIN = 10 ** 9
+
+# Bound on every score, used as an integer infinity by the search
+BOUND = 2 * WIN
+
+# Boards with more cells than this skip symmetry canonicalization
+SYMMETRY_LIMIT = 25
+
+# Boards with more cells than this only search cells next to stones
+NEARBY_LIMIT = 25
+
+# Default seconds minimax may spend deepening its search
+TIME_BUDGET = 1.0
+
+# Nodes searched between checks of the clock
+CHECK_INTERVAL = 64
+
+# Seconds between checks for a stop while waiting on worker processes
+STOP_POLL = 0.05
+
+# Weight of the exploration term in the UCT rule used by mcts
+EXPLORATION = math.sqrt(2)
+
+# Solved 3x3 positions, written by build.py and loaded at import
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solved.bin")
+TABLE_MAGIC = b"TTT3"
+
+# Table byte for positions that are unreachable or already over
+NO_ENTRY = 0xFF
+
+# Base-3 weight of every cell set in a 9-bit mask, to index the table
+TERNARY = [
+    sum(3 ** cell for cell in range(9) if mask >> cell & 1)
+    for mask in range(1 << 9)
+]
+
+
+class SearchTimeout(Exception):
+    """Raised inside a search once its time budget has run out."""
+
+
+class Position():
+    """
+    Bitboard that a search changes in place. stones[0] holds X and
+    stones[1] holds O, and make and unmake keep the move count and the
+    side to move up to date without rescanning the board.
+    """
+
+    __slots__ = ("stones", "count", "side")
+
+    def __init__(self, x, o):
+        self.stones = [x, o]
+        self.count = bin(x | o).count("1")
+        self.side = self.count % 2
+
+    def make(self, move):
+        """Places a stone for the side to move and passes the turn."""
+        self.stones[self.side] |= move
+        self.count += 1
+        self.side ^= 1
+
+    def unmake(self, move):
+        """Takes back the last stone placed, at move."""
+        self.side ^= 1
+        self.count -= 1
+        self.stones[self.side] ^= move
+
+
+class TreeNode():
+    """
+    Node of a Monte Carlo search tree, reached when side played move.
+    score counts the playouts through the node that side won, with half
+    a point for each draw, and over is set when move ended the game.
+    """
+
+    __slots__ = ("move", "side", "parent", "children", "untried",
+                 "visits", "score", "over", "winner")
+
+    def __init__(self, move, side, parent, x, o):
+        self.move = move
+        self.side = side
+        self.parent = parent
+        self.children = []
+        self.visits = 0
+        self.score = 0.0
+        self.winner = None
+        if move and game.wins((x, o)[side], move.bit_length() - 1):
+            self.winner = side
+        self.over = self.winner is not None or x | o == game.full
+        self.untried = [] if self.over else game.moves(x, o)
+
+
+class Game():
+    """
+    Geometry of an m x n board won by k in a row, with the masks a
+    bitboard search needs precomputed. Cell (i, j) is bit i * cols + j.
+    """
+
+    def __init__(self, rows=3, cols=3, k=3):
+        if rows < 1 or cols < 1 or not 1 <= k <= max(rows, cols):
+            raise ValueError(f"no {k}-in-a-row game fits a {rows}x{cols} board")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.full = (1 << self.cells) - 1
+
+        # Every window of k cells in a row, column or diagonal
+        self.lines = []
+        for i in range(rows):
+            for j in range(cols):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    if (0 <= i + (k - 1) * di < rows
+                            and 0 <= j + (k - 1) * dj < cols):
+                        line = 0
+                        for step in range(k):
+                            line |= 1 << ((i + step * di) * cols + j + step * dj)
+                        self.lines.append(line)
+        self.linesThrough = [
+            [line for line in self.lines if line >> cell & 1]
+            for cell in range(self.cells)
+        ]
+
+        # Heuristic credit for a window holding only one player's stones,
+        # capped so that every window together still scores below a win
+        cap = (WIN - 1) // len(self.lines)
+        self.weights = [0] + [min(10 ** count, cap) for count in range(1, k + 1)]
+
+        # Masks used to grow a set of stones by one cell in every direction
+        self.notFirstCol = 0
+        self.notLastCol = 0
+        for i in range(rows):
+            for j in range(cols):
+                if j > 0:
+                    self.notFirstCol |= 1 << (i * cols + j)
+                if j < cols - 1:
+                    self.notLastCol |= 1 << (i * cols + j)
+        self.nearby = self.cells > NEARBY_LIMIT
+        self.center = 1 << ((rows // 2) * cols + cols // 2)
+
+        # Move ordering rank: cells on more lines first, then nearer center
+        cells = sorted(
+            range(self.cells),
+            key=lambda cell: (
+                -len(self.linesThrough[cell]),
+                abs(cell // cols - (rows - 1) / 2) + abs(cell % cols - (cols - 1) / 2)
+            )
+        )
+        self.ranked = [1 << cell for cell in cells]
+
+        # One reusable move list per ply, so the search builds none
+        self.buffers = [[0] * self.cells for _ in range(self.cells + 1)]
+
+        # Lookup tables permuting chunks of a mask under each symmetry
+        self.chunk = self.cells if self.cells <= 12 else 8
+        self.symmetries = []
+        if self.cells <= SYMMETRY_LIMIT:
+            self.symmetries = [
+                permutationTables(symmetry, self.chunk)
+                for symmetry in boardSymmetries(rows, cols)
+            ]
+
+    def wins(self, mask, cell):
+        """Returns True if mask completes a line through cell."""
+        for line in self.linesThrough[cell]:
+            if mask & line == line:
+                return True
+        return False
+
+    def grow(self, mask):
+        """Returns mask along with every cell adjacent to it."""
+        row = mask | (mask << 1) & self.notFirstCol | (mask >> 1) & self.notLastCol
+        return (row | row << self.cols | row >> self.cols) & self.full
+
+    def candidates(self, occupied):
+        """
+        Returns the mask of cells worth searching: every empty cell, or
+        on large boards only those next to a stone.
+        """
+        empty = self.full & ~occupied
+        if self.nearby:
+            near = empty & (self.grow(occupied) if occupied else self.center)
+            return near or empty
+        return empty
+
+    def moves(self, x, o):
+        """
+        Returns the single-bit moves worth searching, in reading order.
+        """
+        empty = self.candidates(x | o)
+        moves = []
+        while empty:
+            move = empty & -empty
+            moves.append(move)
+            empty ^= move
+        return moves
+
+    def evaluate(self, x, o):
+        """
+        Scores a position for X by crediting every line still open to
+        only one player, more steeply the more stones it already holds.
+        """
+        score = 0
+        for line in self.lines:
+            mine = x & line
+            theirs = o & line
+            if mine and not theirs:
+                score += self.weights[bin(mine).count("1")]
+            elif theirs and not mine:
+                score -= self.weights[bin(theirs).count("1")]
+        return score
+
+    def canonical(self, x, o):
+        """
+        Returns a key shared by the bitboard and all of its symmetric
+        images, or the bitboard itself when symmetries are skipped.
+        """
+        if not self.symmetries:
+            return x << self.cells | o
+        return min(
+            self.permute(tables, x) << self.cells | self.permute(tables, o)
+            for tables in self.symmetries
+        )
+
+    def permute(self, tables, mask):
+        """Applies one symmetry's chunk tables to mask."""
+        result = 0
+        for table in tables:
+            result |= table[mask & ((1 << self.chunk) - 1)]
+            mask >>= self.chunk
+        return result
+
+
+def boardSymmetries(rows, cols):
+    """
+    Returns the symmetries of a rows x cols board (8 when square, 4
+    otherwise), each as a list giving for every cell in reading order
+    the cell it takes its value from.
+    """
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (rows - 1 - i, cols - 1 - j),
+        lambda i, j: (i, cols - 1 - j),
+        lambda i, j: (rows - 1 - i, j)
+    ]
+    if rows == cols:
+        n = rows
+        transforms += [
+            lambda i, j: (j, n - 1 - i),
+            lambda i, j: (n - 1 - j, i),
+            lambda i, j: (j, i),
+            lambda i, j: (n - 1 - j, n - 1 - i)
+        ]
+    symmetries = []
+    for transform in transforms:
+        symmetry = []
+        for i in range(rows):
+            for j in range(cols):
+                r, c = transform(i, j)
+                symmetry.append(r * cols + c)
+        symmetries.append(symmetry)
+    return symmetries
+
+
+def permutationTables(symmetry, chunk):
+    """
+    Returns one table per chunk of bits, mapping every value of that
+    chunk to the mask its cells move to under symmetry.
+    """
+    destination = [0] * len(symmetry)
+    for cell, source in enumerate(symmetry):
+        destination[source] = cell
+    tables = []
+    for start in range(0, len(symmetry), chunk):
+        width = min(chunk, len(symmetry) - start)
+        table = []
+        for value in range(1 << width):
+            permuted = 0
+            for bit in range(width):
+                if value >> bit & 1:
+                    permuted |= 1 << destination[start + bit]
+            table.append(permuted)
+        tables.append(table)
+    return tables
+
+
+# The game every board function plays, changed with configure
+game = Game()
+
+# Canonical bitboard -> (value for the player to move, bound type, depth),
+# shared by every search
+transpositions = {}
+
+# Entries stored since a worker's last task, None outside worker processes
+journal = None
+
+# Two most recent moves to cause a cutoff at each ply, reset for each search
+killers = []
+
+
+def resetKillers():
+    """Forgets all killer moves, making room for every ply of the game."""
+    killers[:] = [[0, 0] for _ in range(game.cells + 1)]
+
+
+resetKillers()
+
+# Figures from the most recent minimax or mcts search
+stats = {"nodes": 0, "depth": 0, "time": 0.0, "nps": 0.0,
+         "playouts": 0, "pps": 0.0}
+
+# (root, x, o) of the tree grown by the last mcts call, kept for the next
+tree = None
+
+# Stop event of the running search, which cuts it short as if its time
+# had run out once set from another thread; None when there is none
+stopping = None
+
+
+def buildTable(filename=TABLE_FILE):
+    """
+    Solves every reachable 3x3 position and writes a table with one
+    byte per base-3 position index: the best cell in the low four bits
+    and the game value plus one in the high bits.
+    """
+    board = Game()
+    solutions = {}
+
+    def solve(x, o):
+        """Returns the exact value for X of an unfinished position."""
+        if (x, o) in solutions:
+            return solutions[(x, o)][0]
+        xToMove = bin(x | o).count("1") % 2 == 0
+        best = bestCell = None
+        empty = board.full & ~(x | o)
+        while empty:
+            move = empty & -empty
+            empty ^= move
+            cell = move.bit_length() - 1
+            nx, no = (x | move, o) if xToMove else (x, o | move)
+
+            # Sooner wins score higher, so the table never stalls a win
+            if board.wins(nx if xToMove else no, cell):
+                left = board.cells - bin(nx | no).count("1")
+                v = WIN + left if xToMove else -WIN - left
+            elif nx | no == board.full:
+                v = 0
+            else:
+                v = solve(nx, no)
+            if best is None or (v > best if xToMove else v < best):
+                best, bestCell = v, cell
+        solutions[(x, o)] = (best, bestCell)
+        return best
+
+    solve(0, 0)
+    table = bytearray([NO_ENTRY]) * 3 ** board.cells
+    for (x, o), (v, cell) in solutions.items():
+        outcome = (v > 0) - (v < 0)
+        table[TERNARY[x] + 2 * TERNARY[o]] = cell | (outcome + 1) << 4
+    with open(filename, "wb") as f:
+        f.write(TABLE_MAGIC)
+        f.write(table)
+    return len(solutions)
+
+
+def loadTable(filename=TABLE_FILE):
+    """
+    Returns the solved-position table from filename, or None if it is
+    missing or not a table.
+    """
+    try:
+        with open(filename, "rb") as f:
+            contents = f.read()
+    except OSError:
+        return None
+    if contents[:len(TABLE_MAGIC)] != TABLE_MAGIC or len(contents) != len(TABLE_MAGIC) + 3 ** 9:
+        return None
+    return contents[len(TABLE_MAGIC):]
+
+
+solved = loadTable()
+
+
+def solvedEntry(x, o):
+    """
+    Returns (cell, value) for a 3x3 bitboard from the solved table, or
+    None if the table is missing, another game is configured, or the
+    position has no entry.
+    """
+    if solved is None or (game.rows, game.cols, game.k) != (3, 3, 3):
+        return None
+    entry = solved[TERNARY[x] + 2 * TERNARY[o]]
+    if entry == NO_ENTRY:
+        return None
+    return entry & 0x0F, (entry >> 4) - 1
+
+
+def configure(rows=3, cols=3, k=3):
+    """
+    Switches to an m x n board won by k in a row and clears the
+    transposition table and the mcts tree.
+    """
+    global game, tree
+    game = Game(rows, cols, k)
+    tree = None
+    transpositions.clear()
+    resetKillers()
+
 
 def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * game.cols for _ in range(game.rows)]
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    moves = 0
-    for row in board:
-        for spot in row:
-            if spot:
-                moves += 1
-    return X if moves % 2 == 0 else O
+    x, o = toBitboard(board)
+    return bitPlayer(x, o)
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    actions = []
-    for i, row in enumerate(board):
-        for j, spot in enumerate(row):
-            if(spot is EMPTY):
-                actions.append((i, j))
-    return actions
+    x, o = toBitboard(board)
+    return [toAction(move) for move in bitMoves(x, o)]
 
 
 def result(board, action):
@@ -45,10 +454,7 @@ def result(board, action):
     Returns the board that results from making move (i, j) on the board.
     """
     #Make a copy of the current board
-    newBoard = [[], [], []]
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            newBoard[i].insert(j, board[i][j])
+    newBoard = [row[:] for row in board]
     #Apply the action to the copied board
     newBoard[action[0]][action[1]] = player(board)
     return newBoard
@@ -58,131 +464,654 @@ def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    if rowCheck(board):
-        return rowCheck(board)
-    if diagnolCheck(board):
-        return diagnolCheck(board)
-    if verticalCheck(board):
-        return verticalCheck(board)
-    
-def rowCheck(board):
-    """
-    Checks row win condition
-    Returns X, O, or False
-    """
-    for row in board:
-        rSet = set(row)
-        if len(rSet) == 1 and EMPTY not in rSet:
-            if X in rSet:
-                return X
-            else:
-                return O
-    return False
+    x, o = toBitboard(board)
+    return bitWinner(x, o)
 
-def diagnolCheck(board):
+
+def terminal(board):
     """
-    Checks diagnol win condition
-    Returns X, O, or False
+    Returns True if game is over, False otherwise.
     """
-    dSet = set(board[i][i] for i in range(len(board)))
-    if len(dSet) == 1 and EMPTY not in dSet:
-        if X in dSet:
-            return X
-        else:
-            return O
-    dSet = set(board[i][len(board)-i-1] for i in range(len(board)))
-    if len(dSet) == 1 and EMPTY not in dSet:
-        if X in dSet:
-            return X
-        else:
-            return O
-    return False
+    x, o = toBitboard(board)
+    return bitTerminal(x, o)
+
 
-def verticalCheck(board):
+def utility(board):
     """
-    Checks vertical win condition
-    Returns X, O, or False
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    for j in range(len(board)):
-        vSet = set(board[i][j] for i in range(len(board)))
-        if len(vSet) == 1 and EMPTY not in vSet:
-            if X in vSet:
-                return X
-            else:
-                return O
-    return False
+    x, o = toBitboard(board)
+    return bitUtility(x, o)
 
-def terminal(board):
+
+def toBitboard(board):
     """
-    Returns True if game is over, False otherwise.
+    Converts a list-of-lists board into (x, o) cell masks.
     """
-    #Check for a full board
-    c = 0
-    for row in board:
-        for spot in row:
-            if spot:
-                c+=1
-    if c >= 9:
-        return True
-    #Check for win conditions
-    if rowCheck(board) or diagnolCheck(board) or verticalCheck(board):
-        return True
-    #If we reach this, the game is not complete
-    return False
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, spot in enumerate(row):
+            if spot == X:
+                x |= 1 << (i * game.cols + j)
+            elif spot == O:
+                o |= 1 << (i * game.cols + j)
+    return x, o
 
 
-def utility(board):
+def fromBitboard(x, o):
     """
-    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    Converts (x, o) cell masks back into a list-of-lists board.
+    """
+    board = initial_state()
+    for cell in range(game.cells):
+        if x >> cell & 1:
+            board[cell // game.cols][cell % game.cols] = X
+        elif o >> cell & 1:
+            board[cell // game.cols][cell % game.cols] = O
+    return board
+
+
+def toAction(move):
+    """
+    Returns the (i, j) action for a single-bit move mask.
+    """
+    return divmod(move.bit_length() - 1, game.cols)
+
+
+def bitPlayer(x, o):
+    """
+    Returns the player to move on a bitboard.
+    """
+    return X if bin(x | o).count("1") % 2 == 0 else O
+
+
+def bitMoves(x, o):
     """
-    winUser = winner(board)
-    if winUser == X:
+    Yields each empty cell of a bitboard as a single-bit mask, in
+    reading order.
+    """
+    empty = game.full & ~(x | o)
+    while empty:
+        move = empty & -empty
+        yield move
+        empty ^= move
+
+
+def bitWinner(x, o):
+    """
+    Returns the winner of a bitboard, if there is one.
+    """
+    for line in game.lines:
+        if x & line == line:
+            return X
+        if o & line == line:
+            return O
+    return None
+
+
+def bitTerminal(x, o):
+    """
+    Returns True if the bitboard game is over.
+    """
+    return x | o == game.full or bitWinner(x, o) is not None
+
+
+def bitUtility(x, o):
+    """
+    Returns 1 if X has won the bitboard game, -1 if O has won, 0 otherwise.
+    """
+    won = bitWinner(x, o)
+    if won == X:
         return 1
-    elif winUser == O:
+    elif won == O:
         return -1
     else:
         return 0
 
 
-def minimax(board):
+def lookup(key, depth, alpha, beta):
+    """
+    Probes the transposition table for an entry searched at least depth
+    plies deep. Returns (value, alpha, beta), where value is not None if
+    the entry settles the position and alpha and beta are narrowed by any
+    stored bound.
+    """
+    entry = transpositions.get(key)
+    if entry is not None and entry[2] >= depth:
+        value, bound, _ = entry
+        if bound == EXACT:
+            return value, alpha, beta
+        if bound == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value, alpha, beta
+    return None, alpha, beta
+
+
+def store(key, v, depth, alpha, beta):
+    """Saves a searched value along with how it relates to its window."""
+    if v <= alpha:
+        entry = (v, UPPER, depth)
+    elif v >= beta:
+        entry = (v, LOWER, depth)
+    else:
+        entry = (v, EXACT, depth)
+    transpositions[key] = entry
+    if journal is not None:
+        journal[key] = entry
+
+
+def merge(entries):
+    """
+    Adds transposition entries found elsewhere, keeping whichever entry
+    for a position was searched deeper.
+    """
+    for key, entry in entries.items():
+        current = transpositions.get(key)
+        if current is None or entry[2] >= current[2]:
+            transpositions[key] = entry
+
+
+def minimax(board, budget=TIME_BUDGET, workers=None, stop=None):
     """
     Returns the optimal action for the current player on the board.
-    Makes use of Alpha-Beta Pruning
+    Standard 3x3 positions are answered from the solved table when it
+    is available. Otherwise makes use of Alpha-Beta Pruning, deepened one
+    ply at a time until the game is solved or budget seconds have passed.
+    The first ply is always completed, and a budget of None searches to
+    the end. With more than one worker, root moves are split across a
+    process pool. Setting the stop event ends the search early, as if
+    its time had run out.
     """
-    if terminal(board):
+    global stopping
+    x, o = toBitboard(board)
+    if bitTerminal(x, o):
         return None
-    actionValues = {}
-    if player(board) == X:
-        for action in actions(board):
-            actionValues[action] = minValue(result(board, action), -100, 100)
-    else:
-        for action in actions(board):
-            actionValues[action] = maxValue(result(board, action), -100, 100)
-    if player(board) == X:
-        best_action = max(actionValues, key=actionValues.get)
-    else:
-        best_action = min(actionValues, key=actionValues.get)
-    return best_action
-    
-        
-def maxValue(board, alpha, beta):
-    if terminal(board):
-        return utility(board)
-    v = -100
-    for action in actions(board):
-        v = max(v, minValue(result(board, action), alpha, beta))
+    entry = solvedEntry(x, o)
+    if entry is not None:
+        return divmod(entry[0], 3)
+    stopping = stop
+    try:
+        if workers is not None and workers > 1:
+            halt = multiprocessing.Event()
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=startWorker,
+                initargs=(game.rows, game.cols, game.k, transpositions, halt)
+            ) as pool:
+                return toAction(deepen(
+                    x, o, budget,
+                    lambda x, o, moves, depth, deadline: searchRootParallel(
+                        pool, halt, x, o, moves, depth, deadline
+                    )
+                ))
+        return toAction(deepen(x, o, budget))
+    finally:
+        stopping = None
+
+
+def deepen(x, o, budget, search=None):
+    """
+    Runs iterative-deepening principal variation search from a bitboard,
+    returning the best move from the deepest search completed in time,
+    and records the search figures in stats. search runs each iteration
+    at the root and defaults to searchRoot.
+    """
+    search = search or searchRoot
+    started = time.perf_counter()
+    deadline = started + budget if budget is not None else None
+    stats["nodes"] = 0
+    resetKillers()
+    empties = game.cells - bin(x | o).count("1")
+    moves = game.buffers[0][:orderMoves(game.candidates(x | o), 0)]
+    best = moves[0]
+    depth = 0
+    try:
+        for depth in range(1, empties + 1):
+            best, value = search(x, o, moves, depth, deadline if depth > 1 else None)
+            stats["depth"] = depth
+
+            # Try the best move first in the next iteration
+            moves.remove(best)
+            moves.insert(0, best)
+
+            # Stop early once the game is proven won or lost within the
+            # plies searched; a result from deeper table entries may be slower
+            if abs(value) >= WIN and empties - (abs(value) - WIN) <= depth:
+                break
+    except SearchTimeout:
+        pass
+    stats["time"] = time.perf_counter() - started
+    stats["nps"] = stats["nodes"] / stats["time"] if stats["time"] else 0.0
+    return best
+
+
+def searchRoot(x, o, moves, depth, deadline):
+    """
+    Searches the root moves, in the given order, to depth plies with one
+    alpha-beta window narrowed as each move is scored. Returns the best
+    move along with its value for the player to move.
+    """
+    position = Position(x, o)
+    alpha, beta = -BOUND, BOUND
+    best = moves[0]
+    for index, move in enumerate(moves):
+        cell = move.bit_length() - 1
+        position.make(move)
+        if index == 0:
+            v = -negamax(position, cell, depth - 1, -beta, -alpha, 1, deadline)
+        else:
+            # Prove later moves no better with a null window first
+            v = -negamax(position, cell, depth - 1, -alpha - 1, -alpha, 1, deadline)
+            if alpha < v < beta:
+                v = -negamax(position, cell, depth - 1, -beta, -v, 1, deadline)
+        position.unmake(move)
+        if v > alpha:
+            alpha, best = v, move
+    return best, alpha
+
+
+def analyze(board, depth=None):
+    """
+    Returns a dict mapping every legal action on the board to its value
+    for the player to move, searched depth plies deep, or to the end of
+    the game if depth is None. Values of WIN or more in size are forced
+    results, and the transposition table is kept for later calls.
+    """
+    if depth is not None and depth < 1:
+        raise ValueError("analysis depth must be at least 1")
+    x, o = toBitboard(board)
+    if bitTerminal(x, o):
+        return {}
+    position = Position(x, o)
+    if depth is None:
+        depth = game.cells - position.count
+    values = {}
+    for move in bitMoves(x, o):
+        cell = move.bit_length() - 1
+        position.make(move)
+        values[toAction(move)] = -negamax(position, cell, depth - 1, -BOUND, BOUND, 1, None)
+        position.unmake(move)
+    return values
+
+
+def analyzeBatch(boards, depth=None):
+    """
+    Analyzes every board with one shared transposition table, returning
+    a list with the per-action values of each, and records the nodes,
+    time and nodes per second for the whole batch in stats.
+    """
+    started = time.perf_counter()
+    stats["nodes"] = 0
+    resetKillers()
+    results = [analyze(board, depth) for board in boards]
+    stats["time"] = time.perf_counter() - started
+    stats["nps"] = stats["nodes"] / stats["time"] if stats["time"] else 0.0
+    return results
+
+
+def encode(board):
+    """
+    Returns a board as one line of text, with X, O and . for each cell in
+    reading order.
+    """
+    return "".join(spot or "." for row in board for spot in row)
+
+
+def decode(text):
+    """
+    Returns the board for a line written by encode. Spaces, slashes and
+    commas between cells are ignored, and - or _ may stand for empty.
+    """
+    cells = [c for c in text.strip().upper() if c not in " /,"]
+    if len(cells) != game.cells or any(c not in "XO.-_" for c in cells):
+        raise ValueError(f"not a {game.rows}x{game.cols} position: {text!r}")
+    return [[cells[i * game.cols + j] if cells[i * game.cols + j] in (X, O) else EMPTY
+             for j in range(game.cols)]
+            for i in range(game.rows)]
+
+
+def analyzeFile(filename, depth=None):
+    """
+    Analyzes every position in a file of encoded boards, one per line,
+    skipping blank lines and lines starting with #. Returns a list of
+    (line, values) pairs.
+    """
+    with open(filename) as f:
+        lines = [line.strip() for line in f]
+    lines = [line for line in lines if line and not line.startswith("#")]
+    return list(zip(lines, analyzeBatch([decode(line) for line in lines], depth)))
+
+
+def searchRootParallel(pool, halt, x, o, moves, depth, deadline):
+    """
+    Searches the root like searchRoot, but only the first move is
+    searched here. Its value then bounds the window for the remaining
+    moves, which are searched in the worker pool, and their table entries
+    are merged back in. Moves that beat the first get exact values, so
+    the result matches searchRoot. A stop is passed on to the workers by
+    setting halt.
+    """
+    best = moves[0]
+    position = Position(x, o)
+    position.make(best)
+    alpha = -negamax(position, best.bit_length() - 1, depth - 1, -BOUND, BOUND, 1, deadline)
+    position.unmake(best)
+
+    remaining = deadline - time.perf_counter() if deadline is not None else None
+    futures = [
+        pool.submit(searchMove, x, o, move, depth, alpha, remaining)
+        for move in moves[1:]
+    ]
+    try:
+        pending = futures
+        while pending:
+            pending = wait(pending, timeout=STOP_POLL).not_done
+            if stopping is not None and stopping.is_set():
+                halt.set()
+        results = [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
+
+    # Keep the first move in order that beats the best so far
+    for move, (v, nodes, entries) in zip(moves[1:], results):
+        stats["nodes"] += nodes
+        merge(entries)
+        if v > alpha:
+            alpha, best = v, move
+    return best, alpha
+
+
+def startWorker(rows, cols, k, entries, halt):
+    """
+    Sets up a worker process with the parent's game and table, stopping
+    its searches once halt is set.
+    """
+    global journal, stopping
+    configure(rows, cols, k)
+    transpositions.update(entries)
+    journal = {}
+    stopping = halt
+
+
+def searchMove(x, o, move, depth, alpha, remaining):
+    """
+    Searches one root move in a worker, exactly if it scores above alpha,
+    and returns its value, the nodes searched, and the table entries
+    stored along the way. Raises SearchTimeout once remaining seconds
+    have passed.
+    """
+    deadline = time.perf_counter() + remaining if remaining is not None else None
+    stats["nodes"] = 0
+    journal.clear()
+    position = Position(x, o)
+    position.make(move)
+    cell = move.bit_length() - 1
+
+    # Prove the move no better with a null window first, as searchRoot does
+    v = -negamax(position, cell, depth - 1, -alpha - 1, -alpha, 1, deadline)
+    if v > alpha:
+        v = -negamax(position, cell, depth - 1, -BOUND, -v, 1, deadline)
+    entries = dict(journal)
+    journal.clear()
+    return v, stats["nodes"], entries
+
+
+def checkClock(deadline):
+    """Raises SearchTimeout if deadline has passed or stopping is set."""
+    if stats["nodes"] % CHECK_INTERVAL == 0 and (
+            stopping is not None and stopping.is_set()
+            or deadline is not None and time.perf_counter() > deadline):
+        raise SearchTimeout
+
+
+def orderMoves(candidates, ply):
+    """
+    Writes the moves in candidates into the buffer for ply in search
+    order and returns how many there are. Killer moves for this ply come
+    first, followed by the cells that lie on the most lines (the center,
+    then corners on a 3x3 board).
+    """
+    buffer = game.buffers[ply]
+    count = 0
+    killed = killers[ply]
+    for move in killed:
+        if move & candidates:
+            buffer[count] = move
+            count += 1
+    rest = candidates & ~(killed[0] | killed[1])
+    for move in game.ranked:
+        if move & rest:
+            buffer[count] = move
+            count += 1
+    return count
+
+
+def remember(move, ply):
+    """Records move as a killer for ply, keeping the two most recent."""
+    killed = killers[ply]
+    if killed[0] != move:
+        killed[1] = killed[0]
+        killed[0] = move
+
+
+def negamax(position, last, depth, alpha, beta, ply, deadline):
+    """
+    Principal variation search from the view of the player to move in
+    position, just after the opponent played cell last. Moves are made
+    and unmade on position itself, and read from the buffer for ply.
+    """
+    stats["nodes"] += 1
+
+    # Check before the leaf returns, since most nodes searched are leaves
+    checkClock(deadline)
+    us = position.stones[position.side]
+    them = position.stones[position.side ^ 1]
+    if game.wins(them, last):
+        return -WIN - (game.cells - position.count)
+    if position.count == game.cells:
+        return 0
+    if depth == 0:
+        return game.evaluate(us, them)
+
+    key = game.canonical(us, them)
+    cached, alpha, beta = lookup(key, depth, alpha, beta)
+    if cached is not None:
+        return cached
+    alphaStart, betaStart = alpha, beta
+
+    v = -BOUND
+    moves = game.buffers[ply]
+    for index in range(orderMoves(game.candidates(us | them), ply)):
+        move = moves[index]
+        cell = move.bit_length() - 1
+        position.make(move)
+        if index == 0:
+            score = -negamax(position, cell, depth - 1, -beta, -alpha, ply + 1, deadline)
+        else:
+            # Prove later moves no better with a null window first
+            score = -negamax(position, cell, depth - 1, -alpha - 1, -alpha, ply + 1, deadline)
+            if alpha < score < beta:
+                score = -negamax(position, cell, depth - 1, -beta, -score, ply + 1, deadline)
+        position.unmake(move)
+        v = max(v, score)
         alpha = max(alpha, v)
         if alpha >= beta:
+            remember(move, ply)
             break
+    store(key, v, depth, alphaStart, betaStart)
     return v
 
-def minValue(board, alpha, beta):
-    if terminal(board):
-        return utility(board)
-    v = 100
-    for action in actions(board):
-        v = min(v, maxValue(result(board, action), alpha, beta))
-        beta = min(beta, v)
-        if beta <= alpha:
-            break
-    return v
\ No newline at end of file
+
+def mcts(board, budget=TIME_BUDGET, iterations=None, workers=None, stop=None):
+    """
+    Returns an action for the current player chosen by Monte Carlo tree
+    search, growing the tree with the UCT rule and random playouts for
+    budget seconds or the given number of iterations, whichever ends
+    first. Either limit may be None, but not both. The tree is kept, so
+    a later position reached from this one starts from its subtree. With
+    more than one worker, the other processes grow trees of their own
+    and their root visits are added in. Setting the stop event ends the
+    search early, and records the playouts run and playouts per second
+    in stats.
+    """
+    global tree, stopping
+    if budget is None and iterations is None:
+        raise ValueError("mcts needs a time budget or an iteration count")
+    x, o = toBitboard(board)
+    if bitTerminal(x, o):
+        return None
+    started = time.perf_counter()
+    deadline = started + budget if budget is not None else None
+    root = reuseTree(x, o)
+    tree = (root, x, o)
+
+    visits = {}
+    stopping = stop
+    try:
+        if workers is not None and workers > 1:
+            halt = multiprocessing.Event()
+            with ProcessPoolExecutor(
+                max_workers=workers - 1,
+                initializer=startWorker,
+                initargs=(game.rows, game.cols, game.k, {}, halt)
+            ) as pool:
+                futures = [
+                    pool.submit(searchTree, x, o, budget, iterations, random.getrandbits(64))
+                    for _ in range(workers - 1)
+                ]
+                playouts = growTree(root, x, o, deadline, iterations)
+
+                # The workers cannot see the stop event, so pass it on
+                if stopping is not None and stopping.is_set():
+                    halt.set()
+                for future in futures:
+                    counts, count = future.result()
+                    playouts += count
+                    for move, n in counts.items():
+                        visits[move] = visits.get(move, 0) + n
+        else:
+            playouts = growTree(root, x, o, deadline, iterations)
+    finally:
+        stopping = None
+    for child in root.children:
+        visits[child.move] = visits.get(child.move, 0) + child.visits
+
+    stats["playouts"] = playouts
+    stats["time"] = time.perf_counter() - started
+    stats["pps"] = playouts / stats["time"] if stats["time"] else 0.0
+    return toAction(max(visits, key=visits.get))
+
+
+def reuseTree(x, o):
+    """
+    Returns the node of the kept mcts tree for bitboard (x, o), detached
+    from its parent, or a new root if the tree never reached it.
+    """
+    if tree is not None:
+        node, *stones = tree
+        if not (stones[0] & ~x or stones[1] & ~o):
+            target = (x, o)
+            while node is not None and stones != [x, o]:
+                side = node.side ^ 1
+                added = target[side] & ~stones[side]
+                node = next((child for child in node.children if child.move & added), None)
+                if node is not None:
+                    stones[side] |= node.move
+            if node is not None:
+                node.parent = None
+                return node
+    side = bin(x | o).count("1") % 2
+    return TreeNode(0, side ^ 1, None, x, o)
+
+
+def growTree(root, x, o, deadline, iterations):
+    """
+    Runs mcts iterations on the tree at root, whose position is (x, o),
+    until iterations have run, deadline has passed or stopping is set,
+    and returns how many ran. At least one always runs.
+    """
+    count = 0
+    while True:
+        iterate(root, x, o)
+        count += 1
+        if count == iterations or stopping is not None and stopping.is_set() or (
+                deadline is not None and time.perf_counter() > deadline):
+            return count
+
+
+def iterate(root, x, o):
+    """
+    Runs one mcts iteration: selects a path down the tree by UCT, adds
+    one untried move to it, plays the game out at random from there,
+    and backs the result up the path.
+    """
+    node = root
+    stones = [x, o]
+    while not node.untried and node.children:
+        node = selectChild(node)
+        stones[node.side] |= node.move
+    if node.untried:
+        move = node.untried.pop(random.randrange(len(node.untried)))
+        side = node.side ^ 1
+        stones[side] |= move
+        child = TreeNode(move, side, node, stones[0], stones[1])
+        node.children.append(child)
+        node = child
+
+    if node.over:
+        winner = node.winner
+    else:
+        winner = playout(stones[0], stones[1], node.side ^ 1)
+    while node is not None:
+        node.visits += 1
+        if winner == node.side:
+            node.score += 1.0
+        elif winner is None:
+            node.score += 0.5
+        node = node.parent
+
+
+def selectChild(node):
+    """Returns the child of node with the highest UCT value."""
+    scale = EXPLORATION * math.sqrt(math.log(node.visits))
+    best = None
+    bestValue = -1.0
+    for child in node.children:
+        value = child.score / child.visits + scale / math.sqrt(child.visits)
+        if value > bestValue:
+            best, bestValue = child, value
+    return best
+
+
+def playout(x, o, side):
+    """
+    Plays uniformly random moves on bitboard (x, o), side moving first,
+    and returns the side that wins, or None if the game is drawn.
+    """
+    stones = [x, o]
+    empty = game.full & ~(x | o)
+    cells = [cell for cell in range(game.cells) if empty >> cell & 1]
+    random.shuffle(cells)
+    for cell in cells:
+        stones[side] |= 1 << cell
+        if game.wins(stones[side], cell):
+            return side
+        side ^= 1
+    return None
+
+
+def searchTree(x, o, budget, iterations, seed):
+    """
+    Grows a fresh mcts tree from (x, o) in a worker, and returns the
+    visits of each root move and the number of playouts run.
+    """
+    random.seed(seed)
+    deadline = time.perf_counter() + budget if budget is not None else None
+    side = bin(x | o).count("1") % 2
+    root = TreeNode(0, side ^ 1, None, x, o)
+    count = growTree(root, x, o, deadline, iterations)
+    return {child.move: child.visits for child in root.children}, count
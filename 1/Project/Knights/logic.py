@@ -1,7 +1,51 @@
 import itertools
+import weakref
+
+# Symbols whose every combination is evaluated together by batch_check
+CHUNK_BITS = 16
 
 
 class Sentence():
+    """
+    Immutable logical sentence. Equal sentences are built as one shared
+    node, so they compare by identity, and each node keeps its hash and
+    symbol set from when it was made.
+
+    Because nodes never change, And.conjuncts and Or.disjuncts are tuples,
+    symbols() returns a frozenset, and And.add raises TypeError: collect
+    the facts first and build the knowledge base once with And.of.
+    """
+
+    __slots__ = ("_args", "_hash", "_symbols", "__weakref__")
+
+    # (class, arguments) -> the one node built from them
+    _interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, args, symbols, **fields):
+        """Returns the node of this class for args, building it from fields if new."""
+        node = Sentence._interned.get((cls, args))
+        if node is None:
+            node = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(node, name, value)
+            object.__setattr__(node, "_args", args)
+            object.__setattr__(node, "_hash", hash((cls.__name__, args)))
+            object.__setattr__(node, "_symbols", symbols)
+            Sentence._interned[cls, args] = node
+        return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), self._args)
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -12,8 +56,27 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozen set of all symbols in the logical sentence."""
+        return self._symbols
+
+    def evaluate_batch(self, columns, size):
+        """Evaluates the logical sentence in size models at once, given a NumPy column per symbol."""
+        raise Exception("nothing to evaluate")
+
+    def expression(self, names, lines):
+        """
+        Returns a Python operand holding the value of the sentence, given
+        source for each symbol name, after appending to lines one flat
+        statement for each compound sentence not yet in names.
+        """
+        raise Exception("nothing to compile")
+
+    def assign(self, names, lines, source):
+        """Appends a statement storing source in a new temporary, and returns its name."""
+        temporary = f"t{len(lines)}"
+        lines.append(f"    {temporary} = {source}")
+        names[self] = temporary
+        return temporary
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +106,10 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        return cls.intern((name,), frozenset([name]), name=name)
 
     def __repr__(self):
         return self.name
@@ -62,23 +120,28 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_batch(self, columns, size):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def expression(self, names, lines):
+        try:
+            return names[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
-
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.intern((operand,), operand.symbols(), operand=operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +149,32 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_batch(self, columns, size):
+        return ~self.operand.evaluate_batch(columns, size)
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def expression(self, names, lines):
+        if self in names:
+            return names[self]
+        operand = self.operand.expression(names, lines)
+        return self.assign(names, lines, f"not {operand}")
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        symbols = frozenset().union(*[conjunct.symbols() for conjunct in conjuncts])
+        return cls.intern(conjuncts, symbols, conjuncts=conjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    @classmethod
+    def of(cls, conjuncts):
+        """Returns the conjunction of every sentence in an iterable, built in one step."""
+        return cls(*conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +183,44 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError(
+            "sentences are immutable; collect the facts in a list "
+            "and build the knowledge base once with And.of(facts)"
+        )
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_batch(self, columns, size):
+        import numpy as np
+        result = np.ones(size, dtype=bool)
+        for conjunct in self.conjuncts:
+            result = result & conjunct.evaluate_batch(columns, size)
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def expression(self, names, lines):
+        if not self.conjuncts:
+            return "True"
+        if self in names:
+            return names[self]
+        operands = [conjunct.expression(names, lines) for conjunct in self.conjuncts]
+        return self.assign(names, lines, " and ".join(operands))
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        symbols = frozenset().union(*[disjunct.symbols() for disjunct in disjuncts])
+        return cls.intern(disjuncts, symbols, disjuncts=disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +229,39 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_batch(self, columns, size):
+        import numpy as np
+        result = np.zeros(size, dtype=bool)
+        for disjunct in self.disjuncts:
+            result = result | disjunct.evaluate_batch(columns, size)
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def expression(self, names, lines):
+        if not self.disjuncts:
+            return "False"
+        if self in names:
+            return names[self]
+        operands = [disjunct.expression(names, lines) for disjunct in self.disjuncts]
+        return self.assign(names, lines, " or ".join(operands))
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return cls.intern(
+            (antecedent, consequent),
+            antecedent.symbols() | consequent.symbols(),
+            antecedent=antecedent, consequent=consequent
+        )
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +270,33 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_batch(self, columns, size):
+        return (~self.antecedent.evaluate_batch(columns, size)
+                | self.consequent.evaluate_batch(columns, size))
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def expression(self, names, lines):
+        if self in names:
+            return names[self]
+        antecedent = self.antecedent.expression(names, lines)
+        consequent = self.consequent.expression(names, lines)
+        return self.assign(names, lines, f"not {antecedent} or {consequent}")
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return cls.intern(
+            (left, right), left.symbols() | right.symbols(),
+            left=left, right=right
+        )
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,48 +307,295 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_batch(self, columns, size):
+        return (self.left.evaluate_batch(columns, size)
+                == self.right.evaluate_batch(columns, size))
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def expression(self, names, lines):
+        if self in names:
+            return names[self]
+        left = self.left.expression(names, lines)
+        right = self.right.expression(names, lines)
+        return self.assign(names, lines, f"bool({left}) == bool({right})")
+
+
+def compile_sentence(sentence, symbols, bits=False):
+    """
+    Returns a function evaluating sentence in one call, for a model given
+    as a list of truth values in the order of symbols, or as an int whose
+    bit i holds the value of symbols[i] when bits is True. The function
+    body is one flat statement per compound subsentence, so deeply nested
+    sentences compile as well as shallow ones.
+    """
+    if bits:
+        names = {name: f"(m >> {i} & 1)" for i, name in enumerate(symbols)}
+    else:
+        names = {name: f"m[{i}]" for i, name in enumerate(symbols)}
+    lines = []
+    result = sentence.expression(names, lines)
+    namespace = {}
+    exec("\n".join(["def evaluate(m):"] + lines + [f"    return bool({result})"]), namespace)
+    return namespace["evaluate"]
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
-
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(knowledge.symbols() | query.symbols())
+
+    # Compile both sentences over models numbered by their bits
+    knows = compile_sentence(knowledge, symbols, bits=True)
+    follows = compile_sentence(query, symbols, bits=True)
+
+    # If knowledge base is true in a model, then query must also be true
+    for model in range(1 << len(symbols)):
+        if knows(model) and not follows(model):
+            return False
+    return True
+
+
+def batch_check(knowledge, query):
+    """
+    Checks if knowledge base entails query like model_check, but with
+    NumPy, one chunk of 2^CHUNK_BITS models at a time.
+    """
+    import numpy as np
+
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    low = min(len(symbols), CHUNK_BITS)
+    size = 1 << low
+
+    # Models in a chunk differ in the low symbols, one matrix row each,
+    # and share a value for every other symbol
+    models = (np.arange(size)[:, None] >> np.arange(low)) & 1 == 1
+    columns = {name: models[:, i] for i, name in enumerate(symbols[:low])}
+    for chunk in range(1 << (len(symbols) - low)):
+        for i, name in enumerate(symbols[low:]):
+            columns[name] = np.bool_(chunk >> i & 1)
+
+        # Some model of the knowledge base must not break the query
+        knows = knowledge.evaluate_batch(columns, size)
+        if np.any(knows & ~query.evaluate_batch(columns, size)):
+            return False
+    return True
+
+
+class CNF():
+    """Tseitin encoding of sentences as clauses of signed integer literals."""
+
+    def __init__(self):
+        self.variables = {}
+        self.literals = {}
+        self.clauses = []
+        self.count = 0
+
+    def variable(self):
+        """Returns a new variable number."""
+        self.count += 1
+        return self.count
+
+    def add(self, sentence):
+        """Adds a sentence that must be true."""
+        self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to sentence, defining it if needed."""
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.variable()
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        v = self.variable()
+        if isinstance(sentence, And):
+            parts = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            for p in parts:
+                self.clauses.append([-v, p])
+            self.clauses.append([v] + [-p for p in parts])
+        elif isinstance(sentence, (Or, Implication)):
+            if isinstance(sentence, Or):
+                parts = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            else:
+                parts = [-self.literal(sentence.antecedent),
+                         self.literal(sentence.consequent)]
+            for p in parts:
+                self.clauses.append([v, -p])
+            self.clauses.append([-v] + parts)
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            self.clauses.extend([
+                [-v, -a, b], [-v, a, -b], [v, a, b], [v, -a, -b]
+            ])
+        else:
+            raise TypeError(f"cannot convert {sentence} to CNF")
+        self.literals[sentence] = v
+        return v
+
+
+def satisfy(clauses, count):
+    """
+    Returns a satisfying assignment of clauses over variables 1 to count,
+    as a list of booleans indexed by variable, or None if there is none.
+    Uses CDCL: unit propagation over two watched literals per clause,
+    first-UIP clause learning and non-chronological backjumping.
+    """
+    value = [0] * (count + 1)
+    level = [0] * (count + 1)
+    reason = [None] * (count + 1)
+    activity = [0.0] * (count + 1)
+    seen = [False] * (count + 1)
+    watches = {lit: [] for v in range(1, count + 1) for lit in (v, -v)}
+    trail = []
+    limits = []
+    bump = 1.0
+
+    def truth(lit):
+        return value[lit] if lit > 0 else -value[-lit]
+
+    def assign(lit, clause):
+        v = abs(lit)
+        value[v] = 1 if lit > 0 else -1
+        level[v] = len(limits)
+        reason[v] = clause
+        trail.append(lit)
+
+    def propagate(head):
+        """Assigns every literal implied by the trail, returning a conflict."""
+        while head < len(trail):
+            false = -trail[head]
+            head += 1
+            watching = watches[false]
+            i = j = 0
+            while i < len(watching):
+                clause = watching[i]
+                i += 1
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if truth(first) == 1:
+                    watching[j] = clause
+                    j += 1
+                    continue
+
+                # Look for another literal to watch instead
+                for k in range(2, len(clause)):
+                    if truth(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    watching[j] = clause
+                    j += 1
+                    if truth(first) == -1:
+                        watching[j:] = watching[i:]
+                        return clause
+                    assign(first, clause)
+            del watching[j:]
+        return None
+
+    def analyze(conflict):
+        """Returns the first-UIP clause learned from conflict."""
+        nonlocal bump
+        learned = [0]
+        pending = 0
+        index = len(trail) - 1
+        clause = conflict
+        start = 0
+        while True:
+            for lit in clause[start:]:
+                v = abs(lit)
+                if not seen[v] and level[v] > 0:
+                    seen[v] = True
+                    activity[v] += bump
+                    if level[v] == len(limits):
+                        pending += 1
+                    else:
+                        learned.append(lit)
+            while not seen[abs(trail[index])]:
+                index -= 1
+            p = trail[index]
+            index -= 1
+            seen[abs(p)] = False
+            pending -= 1
+            if pending == 0:
+                break
+            clause = reason[abs(p)]
+            start = 1
+        learned[0] = -p
+        for lit in learned[1:]:
+            seen[abs(lit)] = False
+        bump *= 1.05
+        return learned
+
+    # Load the clauses, dropping tautologies and assigning unit clauses
+    for clause in clauses:
+        clause = list(dict.fromkeys(clause))
+        if any(-lit in clause for lit in clause):
+            continue
+        if not clause:
+            return None
+        if len(clause) == 1:
+            if truth(clause[0]) == -1:
+                return None
+            if truth(clause[0]) == 0:
+                assign(clause[0], None)
+            continue
+        watches[clause[0]].append(clause)
+        watches[clause[1]].append(clause)
+
+    head = 0
+    while True:
+        conflict = propagate(head)
+        head = len(trail)
+        if conflict is not None:
+            if not limits:
+                return None
+            learned = analyze(conflict)
+
+            # Jump back to the deepest level left in the learned clause
+            back = 0
+            for k in range(2, len(learned)):
+                if level[abs(learned[k])] > level[abs(learned[1])]:
+                    learned[1], learned[k] = learned[k], learned[1]
+            if len(learned) > 1:
+                back = level[abs(learned[1])]
+            while len(trail) > limits[back]:
+                v = abs(trail.pop())
+                value[v] = 0
+                reason[v] = None
+            del limits[back:]
+            head = len(trail)
+            if len(learned) == 1:
+                assign(learned[0], None)
+            else:
+                watches[learned[0]].append(learned)
+                watches[learned[1]].append(learned)
+                assign(learned[0], learned)
+        else:
+            # Decide the most active unassigned variable, trying false first
+            choice = 0
+            for v in range(1, count + 1):
+                if value[v] == 0 and (not choice or activity[v] > activity[choice]):
+                    choice = v
+            if not choice:
+                return [v > 0 for v in value]
+            limits.append(len(trail))
+            assign(-choice, None)
+
+
+def sat_check(knowledge, query):
+    """Checks if knowledge base entails query, by showing knowledge ∧ ¬query unsatisfiable."""
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return satisfy(cnf.clauses, cnf.count) is None
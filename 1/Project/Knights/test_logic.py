@@ -0,0 +1,54 @@
+import itertools
+
+from logic import And, Implication, Not, Symbol, model_check
+
+
+def entails(knowledge, query):
+    """Checks entailment by evaluating the sentence trees in every model."""
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    for values in itertools.product([True, False], repeat=len(symbols)):
+        model = dict(zip(symbols, values))
+        if knowledge.evaluate(model) and not query.evaluate(model):
+            return False
+    return True
+
+
+def test_deep_implication_chain():
+    a, b = Symbol("A"), Symbol("B")
+    sentence = a
+    for _ in range(199):
+        sentence = Implication(sentence, b)
+    knowledge = And(sentence, Not(b))
+    assert model_check(knowledge, Not(a)) == entails(knowledge, Not(a))
+    assert model_check(knowledge, a) == entails(knowledge, a)
+
+
+def test_deep_negated_implications():
+    a, b = Symbol("A"), Symbol("B")
+    sentence = a
+    for _ in range(300):
+        sentence = Not(Implication(sentence, b))
+    assert model_check(sentence, a) == entails(sentence, a)
+    assert model_check(sentence, b) == entails(sentence, b)
+
+
+def test_add_refuses_to_change_sentence():
+    a, b = Symbol("A"), Symbol("B")
+    knowledge = And(a)
+    try:
+        knowledge.add(b)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("And.add changed nothing without an error")
+    assert knowledge.conjuncts == (a,)
+
+
+def test_and_of_builds_knowledge_once():
+    facts = [Implication(Symbol(f"P{i}"), Symbol(f"P{i + 1}")) for i in range(10)]
+    facts.append(Symbol("P0"))
+    knowledge = And.of(facts)
+    assert knowledge is And(*facts)
+    assert knowledge.conjuncts == tuple(facts)
+    assert model_check(knowledge, Symbol("P10"))
+    assert And.of(iter([])) is And()